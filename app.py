@@ -51,6 +51,18 @@ LED_COUNT = 145
 LED_BRIGHTNESS = 1.0
 LED_INVERT = False
 
+# Color presets shown in the control panel (built once, reused on every rerun)
+COLOR_PRESETS = (
+    ("🔴 Red", (255, 0, 0)),
+    ("🟢 Green", (0, 255, 0)),
+    ("🔵 Blue", (0, 0, 255)),
+    ("🟡 Yellow", (255, 255, 0)),
+    ("🟣 Purple", (255, 0, 255)),
+    ("🟠 Orange", (255, 165, 0)),
+    ("⚪ White", (255, 255, 255)),
+    ("🌸 Pink", (255, 192, 203))
+)
+
 class SimulatedNeoPixel:
     """Simulated NeoPixel for testing without hardware."""
     def __init__(self, pin, count, brightness=1.0, auto_write=True, pixel_order=None):
@@ -427,7 +439,6 @@ class DemoDataGenerator:
             'database_stats': {
                 'user_interactions': 156,
                 'environmental_data': 1240,
-                'system_logs': 89,
                 'database_size': 2.4
             },
             'system_resources': {
@@ -573,21 +584,10 @@ class SmartNeoPixelDashboard:
         st.write("**🎨 Color Presets**")
         preset_cols = st.columns(8)
         
-        presets = [
-            ("🔴 Red", [255, 0, 0]),
-            ("🟢 Green", [0, 255, 0]),
-            ("🔵 Blue", [0, 0, 255]),
-            ("🟡 Yellow", [255, 255, 0]),
-            ("🟣 Purple", [255, 0, 255]),
-            ("🟠 Orange", [255, 165, 0]),
-            ("⚪ White", [255, 255, 255]),
-            ("🌸 Pink", [255, 192, 203])
-        ]
-        
-        for i, (name, color) in enumerate(presets):
+        for i, (name, color) in enumerate(COLOR_PRESETS):
             with preset_cols[i]:
                 if st.button(name, key=f"preset_{i}"):
-                    self.controller.set_solid_color(tuple(color))
+                    self.controller.set_solid_color(color)
                     st.success(f"✅ {name} applied!")
                     st.rerun()
         
@@ -120,9 +120,10 @@ class SmartLampSetup:
             db.log_environmental_data("setup", 1.0, {"test": "initialization"})
             
             stats = db.get_stats()
+            tables = [name for name in stats if name != 'database_size']
             self.logger.info(f"✓ Database initialized successfully")
             self.logger.info(f"  Database location: {settings.DATABASE_PATH}")
-            self.logger.info(f"  Tables created: {len(stats)} tables")
+            self.logger.info(f"  Tables created: {len(tables)} tables ({', '.join(tables)})")
             
             return True
             
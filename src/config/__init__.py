@@ -6,10 +6,11 @@ All settings are loaded from the .env file to make changes easy.
 """
 
 from .hardware_config import HardwareConfig
-from .settings import Settings
+from .settings import Settings, get_settings, ensure_dotenv_loaded, parse_bool
 
 # Make configs easily accessible
 hardware = HardwareConfig()
-settings = Settings()
+settings = get_settings()
 
-__all__ = ['hardware', 'settings', 'HardwareConfig', 'Settings']
\ No newline at end of file
+__all__ = ['hardware', 'settings', 'HardwareConfig', 'Settings', 'get_settings',
+           'ensure_dotenv_loaded', 'parse_bool']
\ No newline at end of file
@@ -6,15 +6,37 @@ To change any pin, just modify the .env file - no need to touch this code!
 """
 
 import os
-from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
+from .settings import ensure_dotenv_loaded, parse_bool
 
 class HardwareConfig:
     """Hardware pin configuration and settings"""
     
+    __slots__ = (
+        # RGB LED Pins
+        'RGB_LED_1_RED', 'RGB_LED_1_GREEN', 'RGB_LED_1_BLUE',
+        'RGB_LED_2_RED', 'RGB_LED_2_GREEN', 'RGB_LED_2_BLUE',
+        'RGB_LED_3_RED', 'RGB_LED_3_GREEN', 'RGB_LED_3_BLUE',
+        # LED Strip Configuration
+        'LED_STRIP_PIN', 'LED_STRIP_COUNT',
+        # Button Pins
+        'POWER_BUTTON', 'COLOR_BUTTON', 'MODE_BUTTON',
+        # MCP3008 ADC Pins
+        'MCP3008_CLK', 'MCP3008_MISO', 'MCP3008_MOSI', 'MCP3008_CS', 'BRIGHTNESS_CHANNEL',
+        'MCP3008_SPI_SPEED',
+        # Speaker Pin
+        'SPEAKER_PIN',
+        # PWM Settings
+        'RGB_HARDWARE_PWM',
+        # Button Settings
+        'BUTTON_DEBOUNCE_TIME',
+        # System Settings
+        'SYSTEM_STARTUP_DELAY',
+    )
+    
     def __init__(self):
+        ensure_dotenv_loaded()
+        
         # RGB LED Pins (Individual LEDs)
         self.RGB_LED_1_RED = int(os.getenv('RGB_LED_1_RED_PIN', 18))
         self.RGB_LED_1_GREEN = int(os.getenv('RGB_LED_1_GREEN_PIN', 19))
@@ -43,10 +65,14 @@ class HardwareConfig:
         self.MCP3008_MOSI = int(os.getenv('MCP3008_MOSI_PIN', 10))
         self.MCP3008_CS = int(os.getenv('MCP3008_CS_PIN', 8))
         self.BRIGHTNESS_CHANNEL = int(os.getenv('BRIGHTNESS_CHANNEL', 0))
+        self.MCP3008_SPI_SPEED = int(os.getenv('MCP3008_SPI_SPEED', 1350000))
         
         # Speaker Pin
         self.SPEAKER_PIN = int(os.getenv('SPEAKER_PIN', 13))
         
+        # PWM Settings (hardware PWM via pigpio; off by default, it shares the audio PWM)
+        self.RGB_HARDWARE_PWM = parse_bool(os.getenv('RGB_HARDWARE_PWM', 'false'))
+        
         # Button Settings
         self.BUTTON_DEBOUNCE_TIME = float(os.getenv('BUTTON_DEBOUNCE_TIME', 0.2))
         
@@ -6,122 +6,314 @@ Easy to modify without changing code!
 """
 
 import os
-from dotenv import load_dotenv
+import importlib.util
+from bisect import bisect_left
+from functools import lru_cache
+from dotenv import find_dotenv, dotenv_values
 
-# Load environment variables
-load_dotenv()
+# Default colors, used as-is when the env var is not set
+_COLOR_DEFAULTS = {
+    'AQI_GOOD_COLOR': (0, 255, 0),
+    'AQI_MODERATE_COLOR': (255, 255, 0),
+    'AQI_UNHEALTHY_COLOR': (255, 165, 0),
+    'AQI_DANGEROUS_COLOR': (255, 0, 0),
+    'COLD_COLOR': (255, 140, 0),
+    'WARM_COLOR': (255, 255, 255),
+    'HOT_COLOR': (0, 191, 255),
+    'EARTHQUAKE_ALERT_COLOR': (255, 0, 0),
+    'EMERGENCY_COLOR': (255, 0, 255),
+}
+
+# Strings accepted as "on" for boolean settings
+_TRUTHY = frozenset(('true', '1', 'yes', 'on'))
+
+def parse_bool(value):
+    """Parse a boolean setting ('true', '1', 'yes', 'on' in any case)"""
+    return value.strip().lower() in _TRUTHY
+
+# .env location and the mtime it had when last loaded
+_DOTENV_PATH = None
+_DOTENV_MTIME = None
+
+# Values this module copied from .env into os.environ, by key
+_DOTENV_APPLIED = {}
+
+def _apply_dotenv_values(values):
+    """Copy .env values into os.environ without overriding the real process environment
+    
+    Keys unset so far or still holding the value an earlier .env load put there
+    are updated; anything the process exported itself is left alone.
+    """
+    for key, value in values.items():
+        current = os.environ.get(key)
+        if current is None or current == _DOTENV_APPLIED.get(key):
+            os.environ[key] = value
+            _DOTENV_APPLIED[key] = value
+
+def _read_dotenv(dotenv_path):
+    """Parse .env into a dict, skipping keys without a value"""
+    return {k: v for k, v in dotenv_values(dotenv_path).items() if v is not None}
+
+def _load_compiled_env(dotenv_path):
+    """Load .env through a generated .env_cache.py module, rebuilding it when stale
+    
+    The cache is a plain Python dict, so later runs skip the dotenv parser and
+    reuse the interpreter's compiled bytecode instead.
+    """
+    cache_path = os.path.join(os.path.dirname(dotenv_path), '.env_cache.py')
+    
+    if (not os.path.exists(cache_path) or 
+            os.stat(cache_path).st_mtime < os.stat(dotenv_path).st_mtime):
+        values = _read_dotenv(dotenv_path)
+        with open(cache_path, 'w') as f:
+            f.write("# Generated from .env by src/config/settings.py - do not edit\n")
+            f.write(f"ENV = {values!r}\n")
+    
+    spec = importlib.util.spec_from_file_location('_smart_lamp_env_cache', cache_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    
+    return module.ENV
+
+def ensure_dotenv_loaded():
+    """Load .env on first use and again only when the file has changed"""
+    global _DOTENV_PATH, _DOTENV_MTIME
+    
+    # Deployments that inject the environment themselves skip .env entirely
+    if os.environ.get('SMARTLAMP_NO_DOTENV') == '1':
+        return
+    
+    if _DOTENV_PATH is None:
+        _DOTENV_PATH = find_dotenv()
+    if not _DOTENV_PATH:
+        return
+    
+    try:
+        mtime = os.stat(_DOTENV_PATH).st_mtime
+    except OSError:
+        return
+    
+    if mtime != _DOTENV_MTIME:
+        values = None
+        if os.environ.get('SMARTLAMP_ENV_CACHE') == '1':
+            try:
+                values = _load_compiled_env(_DOTENV_PATH)
+            except Exception:
+                # Unwritable directory or broken cache - parse .env directly
+                pass
+        if values is None:
+            values = _read_dotenv(_DOTENV_PATH)
+        
+        # On a reload, edited values replace the ones loaded earlier
+        _apply_dotenv_values(values)
+        
+        _DOTENV_MTIME = mtime
+        _env_snapshot.cache_clear()
+
+@lru_cache(maxsize=1)
+def _env_snapshot():
+    """Snapshot os.environ once so repeated Settings() reuse the same dict"""
+    return dict(os.environ)
 
 class Settings:
     """Application settings and configuration"""
     
-    def __init__(self):
+    __slots__ = (
         # API Configuration
-        self.EARTHQUAKE_API_URL = os.getenv('EARTHQUAKE_API_URL', 
-            'https://earthquake.usgs.gov/earthquakes/feed/v1.0/summary/significant_hour.geojson')
-        self.OPENWEATHER_API_KEY = os.getenv('OPENWEATHER_API_KEY', '')
-        self.OPENWEATHER_API_URL = os.getenv('OPENWEATHER_API_URL', 
-            'http://api.openweathermap.org/data/2.5/air_pollution')
-        self.WEATHER_API_URL = os.getenv('WEATHER_API_URL',
-            'http://api.openweathermap.org/data/2.5/weather')
-        self.RADIO_API_URL = os.getenv('RADIO_API_URL',
-            'http://all.api.radio-browser.info/json/stations/search')
-        
+        'EARTHQUAKE_API_URL', 'OPENWEATHER_API_KEY', 'OPENWEATHER_API_URL',
+        'WEATHER_API_URL', 'RADIO_API_URL',
         # Location Settings
-        self.LOCATION_LAT = float(os.getenv('LOCATION_LAT', 37.5665))
-        self.LOCATION_LON = float(os.getenv('LOCATION_LON', 126.9780))
-        self.LOCATION_CITY = os.getenv('LOCATION_CITY', 'Seoul')
+        'LOCATION_LAT', 'LOCATION_LON', 'LOCATION_CITY',
+        # Thresholds and Limits
+        'EARTHQUAKE_MIN_MAGNITUDE', 'BAD_AIR_THRESHOLD',
+        'COLD_TEMPERATURE_THRESHOLD', 'HOT_TEMPERATURE_THRESHOLD',
+        # Check Intervals
+        'EARTHQUAKE_CHECK_INTERVAL', 'AIR_QUALITY_CHECK_INTERVAL', 'WEATHER_CHECK_INTERVAL',
+        # ML Model Settings
+        'ML_LEARNING_PERIOD_DAYS', 'ML_PREDICTION_ACCURACY_THRESHOLD',
+        'ML_MODEL_UPDATE_INTERVAL', 'ML_DATA_COLLECTION_INTERVAL',
+        # File Paths
+        'ML_MODEL_PATH', 'ML_DATA_PATH', 'STATE_FILE_PATH', 'LOG_FILE_PATH', 'DATABASE_PATH',
+        'BACKUP_DATABASE_PATH',
+        # Database Settings
+        'DATABASE_IN_MEMORY', 'DATABASE_SYNC_INTERVAL',
+        # LED Strip Configuration
+        'LED_STRIP_COUNT',
+        # Colors
+        'DEFAULT_COLOR',
+        'AQI_GOOD_COLOR', 'AQI_MODERATE_COLOR', 'AQI_UNHEALTHY_COLOR', 'AQI_DANGEROUS_COLOR',
+        'COLD_COLOR', 'WARM_COLOR', 'HOT_COLOR',
+        'EARTHQUAKE_ALERT_COLOR', 'EMERGENCY_COLOR',
+        '_aqi_breaks', '_aqi_colors',
+        # Derived once in __init__
+        '_api_key_valid', '_repr',
+        # Brightness Settings
+        'MIN_BRIGHTNESS', 'MAX_BRIGHTNESS', 'DEFAULT_BRIGHTNESS',
+        # Auto Mode Settings
+        'AUTO_COLOR_CYCLE_INTERVAL', 'AUTO_BRIGHTNESS_ADJUSTMENT',
+        # Web Interface
+        'STREAMLIT_PORT', 'WEB_UPDATE_INTERVAL',
+        # Audio Settings
+        'DEFAULT_VOLUME', 'ALERT_VOLUME', 'RADIO_VOLUME',
+        # System Settings
+        'LOG_LEVEL', 'API_TIMEOUT',
+    )
+    
+    # Numeric settings: (name, type, default). The env key matches the name.
+    _SCHEMA = (
+        # Location Settings
+        ('LOCATION_LAT', float, 37.5665),
+        ('LOCATION_LON', float, 126.9780),
         
         # Thresholds and Limits
-        self.EARTHQUAKE_MIN_MAGNITUDE = float(os.getenv('EARTHQUAKE_MIN_MAGNITUDE', 5.5))
-        self.BAD_AIR_THRESHOLD = int(os.getenv('BAD_AIR_THRESHOLD', 100))
-        self.COLD_TEMPERATURE_THRESHOLD = int(os.getenv('COLD_TEMPERATURE_THRESHOLD', 18))
-        self.HOT_TEMPERATURE_THRESHOLD = int(os.getenv('HOT_TEMPERATURE_THRESHOLD', 28))
+        ('EARTHQUAKE_MIN_MAGNITUDE', float, 5.5),
+        ('BAD_AIR_THRESHOLD', int, 100),
+        ('COLD_TEMPERATURE_THRESHOLD', int, 18),
+        ('HOT_TEMPERATURE_THRESHOLD', int, 28),
         
         # Check Intervals (seconds)
-        self.EARTHQUAKE_CHECK_INTERVAL = int(os.getenv('EARTHQUAKE_CHECK_INTERVAL', 300))
-        self.AIR_QUALITY_CHECK_INTERVAL = int(os.getenv('AIR_QUALITY_CHECK_INTERVAL', 600))
-        self.WEATHER_CHECK_INTERVAL = int(os.getenv('WEATHER_CHECK_INTERVAL', 900))
+        ('EARTHQUAKE_CHECK_INTERVAL', int, 300),
+        ('AIR_QUALITY_CHECK_INTERVAL', int, 600),
+        ('WEATHER_CHECK_INTERVAL', int, 900),
         
         # ML Model Settings
-        self.ML_LEARNING_PERIOD_DAYS = int(os.getenv('ML_LEARNING_PERIOD_DAYS', 7))
-        self.ML_PREDICTION_ACCURACY_THRESHOLD = float(os.getenv('ML_PREDICTION_ACCURACY_THRESHOLD', 0.75))
-        self.ML_MODEL_UPDATE_INTERVAL = int(os.getenv('ML_MODEL_UPDATE_INTERVAL', 3600))
-        self.ML_DATA_COLLECTION_INTERVAL = int(os.getenv('ML_DATA_COLLECTION_INTERVAL', 60))
-        
-        # File Paths
-        self.ML_MODEL_PATH = os.getenv('ML_MODEL_PATH', 'models/user_pattern.pkl')
-        self.ML_DATA_PATH = os.getenv('ML_DATA_PATH', 'data/smart_lamp.db')
-        self.STATE_FILE_PATH = os.getenv('STATE_FILE_PATH', 'data/lamp_state.json')
-        self.LOG_FILE_PATH = os.getenv('LOG_FILE_PATH', 'logs/smart_lamp.log')
-        self.DATABASE_PATH = os.getenv('DATABASE_PATH', 'data/smart_lamp.db')
+        ('ML_LEARNING_PERIOD_DAYS', int, 7),
+        ('ML_PREDICTION_ACCURACY_THRESHOLD', float, 0.75),
+        ('ML_MODEL_UPDATE_INTERVAL', int, 3600),
+        ('ML_DATA_COLLECTION_INTERVAL', int, 60),
         
         # LED Strip Configuration (for display purposes)
-        self.LED_STRIP_COUNT = int(os.getenv('LED_STRIP_COUNT', 30))
+        ('LED_STRIP_COUNT', int, 30),
+        
+        # Brightness Settings
+        ('MIN_BRIGHTNESS', int, 5),
+        ('MAX_BRIGHTNESS', int, 100),
+        ('DEFAULT_BRIGHTNESS', int, 50),
+        
+        # Auto Mode Settings
+        ('AUTO_COLOR_CYCLE_INTERVAL', int, 30),
+        
+        # Web Interface
+        ('STREAMLIT_PORT', int, 8501),
+        ('WEB_UPDATE_INTERVAL', int, 5),
+        
+        # Audio Settings
+        ('DEFAULT_VOLUME', int, 50),
+        ('ALERT_VOLUME', int, 80),
+        ('RADIO_VOLUME', int, 30),
+        
+        # Database Settings
+        ('DATABASE_SYNC_INTERVAL', int, 60),
+        
+        # System Settings
+        ('API_TIMEOUT', int, 10),
+    )
+    
+    def __init__(self):
+        ensure_dotenv_loaded()
+        env = _env_snapshot()
+        get = env.get  # bound once; used for every lookup below
+        
+        # Numeric settings (see _SCHEMA)
+        for name, cast, default in self._SCHEMA:
+            setattr(self, name, cast(get(name, default)))
+        
+        # API Configuration
+        self.EARTHQUAKE_API_URL = get('EARTHQUAKE_API_URL', 
+            'https://earthquake.usgs.gov/earthquakes/feed/v1.0/summary/significant_hour.geojson')
+        self.OPENWEATHER_API_KEY = get('OPENWEATHER_API_KEY', '')
+        self.OPENWEATHER_API_URL = get('OPENWEATHER_API_URL', 
+            'http://api.openweathermap.org/data/2.5/air_pollution')
+        self.WEATHER_API_URL = get('WEATHER_API_URL',
+            'http://api.openweathermap.org/data/2.5/weather')
+        self.RADIO_API_URL = get('RADIO_API_URL',
+            'http://all.api.radio-browser.info/json/stations/search')
+        
+        # Location Settings
+        self.LOCATION_CITY = get('LOCATION_CITY', 'Seoul')
+        
+        # File Paths
+        self.ML_MODEL_PATH = get('ML_MODEL_PATH', 'models/user_pattern.pkl')
+        self.ML_DATA_PATH = get('ML_DATA_PATH', 'data/smart_lamp.db')
+        self.STATE_FILE_PATH = get('STATE_FILE_PATH', 'data/lamp_state.json')
+        self.LOG_FILE_PATH = get('LOG_FILE_PATH', 'logs/smart_lamp.log')
+        self.DATABASE_PATH = get('DATABASE_PATH', 'data/smart_lamp.db')
+        self.BACKUP_DATABASE_PATH = get('BACKUP_DATABASE_PATH', 'data/smart_lamp_backup.db')
         
         # Colors (RGB tuples)
-        self.DEFAULT_COLOR = self._parse_color(os.getenv('DEFAULT_COLOR_RED', '255'), 
-                                               os.getenv('DEFAULT_COLOR_GREEN', '255'), 
-                                               os.getenv('DEFAULT_COLOR_BLUE', '255'))
+        self.DEFAULT_COLOR = self._parse_color(get('DEFAULT_COLOR_RED', '255'), 
+                                               get('DEFAULT_COLOR_GREEN', '255'), 
+                                               get('DEFAULT_COLOR_BLUE', '255'))
         
         # Air Quality Colors
-        self.AQI_GOOD_COLOR = self._parse_rgb_string(os.getenv('AQI_GOOD_COLOR', '0,255,0'))
-        self.AQI_MODERATE_COLOR = self._parse_rgb_string(os.getenv('AQI_MODERATE_COLOR', '255,255,0'))
-        self.AQI_UNHEALTHY_COLOR = self._parse_rgb_string(os.getenv('AQI_UNHEALTHY_COLOR', '255,165,0'))
-        self.AQI_DANGEROUS_COLOR = self._parse_rgb_string(os.getenv('AQI_DANGEROUS_COLOR', '255,0,0'))
+        self.AQI_GOOD_COLOR = self._rgb(env, 'AQI_GOOD_COLOR')
+        self.AQI_MODERATE_COLOR = self._rgb(env, 'AQI_MODERATE_COLOR')
+        self.AQI_UNHEALTHY_COLOR = self._rgb(env, 'AQI_UNHEALTHY_COLOR')
+        self.AQI_DANGEROUS_COLOR = self._rgb(env, 'AQI_DANGEROUS_COLOR')
         
         # Temperature Colors
-        self.COLD_COLOR = self._parse_rgb_string(os.getenv('COLD_COLOR', '255,140,0'))
-        self.WARM_COLOR = self._parse_rgb_string(os.getenv('WARM_COLOR', '255,255,255'))
-        self.HOT_COLOR = self._parse_rgb_string(os.getenv('HOT_COLOR', '0,191,255'))
+        self.COLD_COLOR = self._rgb(env, 'COLD_COLOR')
+        self.WARM_COLOR = self._rgb(env, 'WARM_COLOR')
+        self.HOT_COLOR = self._rgb(env, 'HOT_COLOR')
         
         # Alert Colors
-        self.EARTHQUAKE_ALERT_COLOR = self._parse_rgb_string(os.getenv('EARTHQUAKE_ALERT_COLOR', '255,0,0'))
-        self.EMERGENCY_COLOR = self._parse_rgb_string(os.getenv('EMERGENCY_COLOR', '255,0,255'))
+        self.EARTHQUAKE_ALERT_COLOR = self._rgb(env, 'EARTHQUAKE_ALERT_COLOR')
+        self.EMERGENCY_COLOR = self._rgb(env, 'EMERGENCY_COLOR')
         
-        # Brightness Settings
-        self.MIN_BRIGHTNESS = int(os.getenv('MIN_BRIGHTNESS', 5))
-        self.MAX_BRIGHTNESS = int(os.getenv('MAX_BRIGHTNESS', 100))
-        self.DEFAULT_BRIGHTNESS = int(os.getenv('DEFAULT_BRIGHTNESS', 50))
+        # AQI lookup table: upper bound of each band -> band color
+        self._aqi_breaks = (50, 100, 150)
+        self._aqi_colors = (self.AQI_GOOD_COLOR, self.AQI_MODERATE_COLOR,
+                            self.AQI_UNHEALTHY_COLOR, self.AQI_DANGEROUS_COLOR)
         
         # Auto Mode Settings
-        self.AUTO_COLOR_CYCLE_INTERVAL = int(os.getenv('AUTO_COLOR_CYCLE_INTERVAL', 30))
-        self.AUTO_BRIGHTNESS_ADJUSTMENT = os.getenv('AUTO_BRIGHTNESS_ADJUSTMENT', 'True').lower() == 'true'
+        self.AUTO_BRIGHTNESS_ADJUSTMENT = parse_bool(get('AUTO_BRIGHTNESS_ADJUSTMENT', 'True'))
         
-        # Web Interface
-        self.STREAMLIT_PORT = int(os.getenv('STREAMLIT_PORT', 8501))
-        self.WEB_UPDATE_INTERVAL = int(os.getenv('WEB_UPDATE_INTERVAL', 5))
-        
-        # Audio Settings
-        self.DEFAULT_VOLUME = int(os.getenv('DEFAULT_VOLUME', 50))
-        self.ALERT_VOLUME = int(os.getenv('ALERT_VOLUME', 80))
-        self.RADIO_VOLUME = int(os.getenv('RADIO_VOLUME', 30))
+        # Database Settings
+        self.DATABASE_IN_MEMORY = parse_bool(get('DATABASE_IN_MEMORY', 'False'))
         
         # System Settings
-        self.LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
-        self.API_TIMEOUT = int(os.getenv('API_TIMEOUT', 10))
+        self.LOG_LEVEL = get('LOG_LEVEL', 'INFO')
+        
+        # Values are fixed after init, so derive these once
+        self._api_key_valid = bool(self.OPENWEATHER_API_KEY and 
+                                   self.OPENWEATHER_API_KEY != 'your_openweather_api_key_here')
+        self._repr = f"""
+Settings Configuration:
+- Location: {self.LOCATION_CITY} ({self.LOCATION_LAT}, {self.LOCATION_LON})
+- Earthquake threshold: {self.EARTHQUAKE_MIN_MAGNITUDE}
+- Air quality threshold: {self.BAD_AIR_THRESHOLD}
+- Temperature range: {self.COLD_TEMPERATURE_THRESHOLD}°C - {self.HOT_TEMPERATURE_THRESHOLD}°C
+- ML learning period: {self.ML_LEARNING_PERIOD_DAYS} days
+- API key configured: {self._api_key_valid}
+        """
     
     def _parse_color(self, r, g, b):
         """Parse individual RGB values into tuple"""
         return (int(r), int(g), int(b))
     
-    def _parse_rgb_string(self, rgb_string):
-        """Parse RGB string like '255,0,0' into tuple (255, 0, 0)"""
+    def _rgb(self, env, key):
+        """Get a color setting, skipping the parse when the default applies"""
+        value = env.get(key)
+        if value is None:
+            return _COLOR_DEFAULTS[key]
+        return self._parse_rgb_string(value)
+    
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def _parse_rgb_string(rgb_string):
+        """Parse RGB string like '255,0,0' into tuple (255, 0, 0)
+        
+        Cached on the raw string, so every Settings() shares the same tuples.
+        """
         try:
-            r, g, b = rgb_string.split(',')
-            return (int(r.strip()), int(g.strip()), int(b.strip()))
-        except:
+            r, g, b = map(int, rgb_string.replace(' ', '').split(','))
+            return (r, g, b)
+        except ValueError:
             return (255, 255, 255)  # Default to white if parsing fails
     
     def get_aqi_color(self, aqi_value):
         """Get color based on AQI value"""
-        if aqi_value <= 50:
-            return self.AQI_GOOD_COLOR
-        elif aqi_value <= 100:
-            return self.AQI_MODERATE_COLOR
-        elif aqi_value <= 150:
-            return self.AQI_UNHEALTHY_COLOR
-        else:
-            return self.AQI_DANGEROUS_COLOR
+        return self._aqi_colors[bisect_left(self._aqi_breaks, aqi_value)]
     
     def get_temperature_color(self, temperature):
         """Get color based on temperature"""
@@ -132,18 +324,21 @@ class Settings:
         else:
             return self.WARM_COLOR
     
+    @classmethod
+    def reload(cls):
+        """Drop the cached instance so the next get_settings() re-reads the environment"""
+        _env_snapshot.cache_clear()
+        get_settings.cache_clear()
+    
     def is_api_key_valid(self):
         """Check if required API keys are present"""
-        return bool(self.OPENWEATHER_API_KEY and self.OPENWEATHER_API_KEY != 'your_openweather_api_key_here')
+        return self._api_key_valid
     
     def __str__(self):
         """String representation for debugging"""
-        return f"""
-Settings Configuration:
-- Location: {self.LOCATION_CITY} ({self.LOCATION_LAT}, {self.LOCATION_LON})
-- Earthquake threshold: {self.EARTHQUAKE_MIN_MAGNITUDE}
-- Air quality threshold: {self.BAD_AIR_THRESHOLD}
-- Temperature range: {self.COLD_TEMPERATURE_THRESHOLD}°C - {self.HOT_TEMPERATURE_THRESHOLD}°C
-- ML learning period: {self.ML_LEARNING_PERIOD_DAYS} days
-- API key configured: {self.is_api_key_valid()}
-        """
\ No newline at end of file
+        return self._repr
+
+@lru_cache(maxsize=1)
+def get_settings():
+    """Get the shared Settings instance (built once per process)"""
+    return Settings()
@@ -4,7 +4,6 @@ Database Manager for Smart Lamp
 Simple SQLite database for storing:
 - User interactions (ON/OFF, color changes)
 - Environmental data (weather, air quality, earthquakes)
-- System logs
 
 Independent module - lightweight and easy to use.
 """
@@ -13,47 +12,381 @@ import sqlite3
 import logging
 import json
 import os
+import atexit
+import threading
+import queue
+import tempfile
+import time
+import weakref
+from contextlib import contextmanager
+from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 
+import numpy as np
+
 from config import settings
 
+# orjson is optional: a faster drop-in for json.dumps/loads on small dicts
+try:
+    import orjson
+    
+    def _dumps(obj) -> str:
+        return orjson.dumps(obj).decode()
+    
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj) -> str:
+        return json.dumps(obj, separators=(',', ':'))  # compact, like orjson
+    
+    _loads = json.loads
+
+
+def _encode_details(details: Optional[Dict]) -> Optional[str]:
+    """Serialize a details dict for storage; None and {} are both stored as NULL"""
+    return _dumps(details) if details else None
+
+
+def _close_connection(conn: sqlite3.Connection):
+    """Close a connection, ignoring errors (used by per-thread finalizers)"""
+    try:
+        conn.close()
+    except sqlite3.Error:
+        pass
+
+
+class _ThreadConnections:
+    """A thread's cached connections; dropped with the thread-local when the thread exits"""
+    
+    def __init__(self):
+        self.conn = None
+        self.reader = None
+
 class DatabaseManager:
     """Simple database manager for Smart Lamp"""
     
+    # Applied to every new connection (journal_mode=WAL is persistent and set once)
+    _CONNECTION_PRAGMAS = (
+        'PRAGMA synchronous=NORMAL',          # fsync at checkpoints, not every commit
+        'PRAGMA busy_timeout=5000',           # wait for a busy writer instead of failing
+        'PRAGMA temp_store=MEMORY',
+        'PRAGMA cache_size=-8000',            # ~8 MB page cache
+        'PRAGMA mmap_size=268435456',         # 256 MB memory-mapped reads
+        'PRAGMA wal_autocheckpoint=1000',     # checkpoint once the WAL reaches ~1000 pages
+        'PRAGMA journal_size_limit=6144000',  # truncate the WAL back to ~6 MB after checkpoints
+    )
+    
+    # Background writer: commit up to this many rows, or whatever arrived in this window
+    _WRITE_BATCH_SIZE = 500
+    _WRITE_BATCH_INTERVAL = 0.1  # seconds
+    
+    # Queued by flush() to end the current batch window early
+    _FLUSH = object()
+    
+    # Sleeps between retries of a write that failed with "database is locked"
+    _RETRY_DELAYS = (0.01, 0.05, 0.25)  # seconds
+    
+    # Bumped on schema changes; stored in PRAGMA user_version
+    _SCHEMA_VERSION = 3
+    
+    # Non-timestamp columns per table, copied as-is by the v0 -> v1 migration
+    _TABLE_COLUMNS = {
+        'user_interactions': ('action', 'color_r', 'color_g', 'color_b', 'brightness'),
+        'environmental_data': ('data_type', 'value', 'details'),
+    }
+    
+    # Row layout of get_user_pattern_array(); missing color/brightness are stored as -1
+    PATTERN_DTYPE = np.dtype([
+        ('action', 'U20'),
+        ('r', 'i2'), ('g', 'i2'), ('b', 'i2'),
+        ('brightness', 'i2'),
+        ('hour', 'i1'), ('day_of_week', 'i1'),
+        ('timestamp', 'i8'),
+    ])
+    
+    # Hot-path INSERTs, kept as fixed compact strings (sqlite3 caches statements by SQL text).
+    # timestamp is bound when the row is queued, so batching doesn't shift it to commit time
+    _INSERT_USER_ACTION_SQL = ('INSERT INTO user_interactions'
+                               '(timestamp,action,color_r,color_g,color_b,brightness)VALUES(?,?,?,?,?,?)')
+    _INSERT_ENV_SQL = 'INSERT INTO environmental_data(timestamp,data_type,value,details)VALUES(?,?,?,?)'
+    
+    # Retention DELETEs used by cleanup_old_data, bound with a '-N days' modifier
+    _DELETE_OLDER_THAN_SQL = {
+        table: f"DELETE FROM {table} WHERE timestamp<CAST(strftime('%s','now',?) AS INTEGER)"
+        for table in ('user_interactions', 'environmental_data')
+    }
+    
     def __init__(self, db_path: str = None):
         self.logger = logging.getLogger(__name__)
         self.db_path = db_path or settings.DATABASE_PATH
+        self.disk_path = self.db_path
+        
+        # One cached connection per thread (see _get_connection), closed by a
+        # finalizer when its thread exits or by close()
+        self._local = threading.local()
+        self._finalizers = []
+        self._connections_lock = threading.Lock()
+        atexit.register(self.close)
+        
+        # Row counts for get_stats, counted once and then kept up to date by
+        # the writer and cleanup (they hold the lock across each commit; readers
+        # only take it for the initial count)
+        self._counts = None
+        self._counts_lock = threading.Lock()
         
         # Create data directory if it doesn't exist
-        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        
+        # Optionally run from a RAM copy and sync it back to disk periodically
+        self._sync_thread = None
+        if settings.DATABASE_IN_MEMORY:
+            self._use_memory_copy()
         
         # Initialize database
         self._create_tables()
-        self.logger.info(f"Database initialized: {self.db_path}")
+        self._enable_wal()
+        
+        # log_* calls only queue rows; a writer thread commits them in batches.
+        # Once close() starts, nothing more is queued (see _enqueue)
+        self._write_queue = queue.Queue(maxsize=10000)
+        self._closing = False
+        self._closing_lock = threading.Lock()
+        self._writer_thread = threading.Thread(target=self._writer_loop, name="db-writer")
+        self._writer_thread.daemon = True
+        self._writer_thread.start()
+        
+        if self.db_path != self.disk_path:
+            self._sync_stop = threading.Event()
+            self._sync_thread = threading.Thread(target=self._sync_loop, name="db-sync")
+            self._sync_thread.daemon = True
+            self._sync_thread.start()
+        
+        self.logger.info("Database initialized: %s", self.db_path)
+    
+    def _get_connection(self, readonly: bool = False):
+        """Get this thread's database connection (opened once, then reused)
+        
+        readonly=True returns a separate per-thread connection opened with
+        mode=ro and query_only, used by the get_* readers.
+        """
+        holder = getattr(self._local, 'holder', None)
+        if holder is None:
+            holder = self._local.holder = _ThreadConnections()
+        
+        attr = 'reader' if readonly else 'conn'
+        conn = getattr(holder, attr)
+        if conn is None:
+            if readonly:
+                target = Path(self.db_path).resolve().as_uri() + '?mode=ro'
+            else:
+                target = self.db_path
+            
+            # check_same_thread=False only so close() can run from any thread;
+            # each connection is still used by the thread that opened it.
+            # isolation_level=None: autocommit, transactions are explicit (see _transaction)
+            conn = sqlite3.connect(target, uri=readonly, check_same_thread=False, isolation_level=None,
+                                   cached_statements=256)
+            for pragma in self._CONNECTION_PRAGMAS:
+                conn.execute(pragma)
+            if readonly:
+                conn.execute('PRAGMA query_only=1')
+            
+            setattr(holder, attr, conn)
+            with self._connections_lock:
+                self._finalizers = [f for f in self._finalizers if f.alive]
+                self._finalizers.append(weakref.finalize(holder, _close_connection, conn))
+        
+        return conn
+    
+    @contextmanager
+    def _transaction(self):
+        """Run the enclosed statements as one explicit write transaction"""
+        conn = self._get_connection()
+        conn.execute('BEGIN IMMEDIATE')  # take the write lock up front
+        try:
+            yield conn
+            conn.execute('COMMIT')
+        except Exception:
+            # SQLite may already have rolled back (e.g. SQLITE_FULL, IOERR)
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+    
+    def _use_memory_copy(self):
+        """Move the live database to /dev/shm, seeded from the on-disk copy"""
+        if not os.path.isdir('/dev/shm'):
+            self.logger.warning("DATABASE_IN_MEMORY set but /dev/shm not available, using disk")
+            return
+        
+        memory_path = None
+        try:
+            # Unique per instance, so two managers on the same DATABASE_PATH never share it
+            fd, memory_path = tempfile.mkstemp(prefix='smart_lamp_', suffix=f'_{Path(self.disk_path).name}',
+                                               dir='/dev/shm')
+            os.close(fd)
+            
+            if os.path.exists(self.disk_path):
+                source = sqlite3.connect(self.disk_path)
+                target = sqlite3.connect(memory_path)
+                try:
+                    source.backup(target)
+                finally:
+                    target.close()
+                    source.close()
+            
+            self.db_path = memory_path
+            self.logger.info("Database running in memory: %s", memory_path)
+            
+        except Exception as e:
+            self.logger.error("Failed to set up in-memory database, using disk: %s", e)
+            if memory_path:
+                self._remove_database_files(memory_path)
     
-    def _get_connection(self):
-        """Get database connection"""
-        return sqlite3.connect(self.db_path)
+    def _sync_loop(self):
+        """Background thread: copy the in-memory database to disk every sync interval"""
+        while not self._sync_stop.wait(settings.DATABASE_SYNC_INTERVAL):
+            self.sync_to_disk()
+    
+    def sync_to_disk(self):
+        """Copy the in-memory database to its on-disk path (no-op when running from disk)"""
+        if self.db_path == self.disk_path:
+            return
+        
+        self.flush()
+        try:
+            self._backup_to(self.disk_path)
+                
+        except Exception as e:
+            self.logger.error("Failed to sync database to disk: %s", e)
+    
+    def backup_database(self, backup_path: str = None) -> bool:
+        """Write a consistent copy of the database to backup_path (safe while logging continues)"""
+        backup_path = backup_path or settings.BACKUP_DATABASE_PATH
+        self.flush()
+        try:
+            Path(backup_path).parent.mkdir(parents=True, exist_ok=True)
+            self._backup_to(backup_path)
+            
+            self.logger.info("Database backed up to %s", backup_path)
+            return True
+            
+        except Exception as e:
+            self.logger.error("Failed to back up database: %s", e)
+            return False
+    
+    def _backup_to(self, path: str):
+        """Copy the live database into the SQLite file at path using the online backup API"""
+        target = sqlite3.connect(path)
+        try:
+            # One step: a stepped backup restarts whenever the writer commits in between
+            self._get_connection().backup(target)
+        finally:
+            target.close()
+    
+    def _with_retry(self, operation, *args):
+        """Run operation(*args), retrying with backoff while the database is busy/locked"""
+        for delay in self._RETRY_DELAYS:
+            try:
+                return operation(*args)
+            except sqlite3.OperationalError as e:
+                if 'locked' not in str(e):
+                    raise
+                self.logger.warning("Database busy, retrying in %.0f ms: %s", delay * 1000, e)
+                time.sleep(delay)
+        
+        return operation(*args)  # last attempt; errors go to the caller
+    
+    def close(self):
+        """Flush queued writes, stop the writer thread and close all connections"""
+        with self._closing_lock:
+            already_closing = self._closing
+            self._closing = True
+        
+        writer = getattr(self, '_writer_thread', None)
+        if writer and writer.is_alive():
+            if not already_closing:
+                self._write_queue.put(None)  # stop signal, after any queued rows
+            writer.join(timeout=5)
+        
+        # _counts_lock is held across every write commit, so direct writes (log_*
+        # after close started, batch loggers) wait here and then go to the disk file
+        with self._counts_lock:
+            # Final copy of the in-memory database before its connections go away
+            sync_thread = getattr(self, '_sync_thread', None)
+            if sync_thread and sync_thread.is_alive():
+                self._sync_stop.set()
+                sync_thread.join(timeout=5)
+                self.sync_to_disk()
+            
+            with self._connections_lock:
+                for finalizer in self._finalizers:
+                    finalizer()
+                self._finalizers.clear()
+                self._local = threading.local()
+            
+            # The RAM copy (created by this instance) has been synced; free it
+            if self.db_path != self.disk_path:
+                self._remove_database_files(self.db_path)
+                self.db_path = self.disk_path
+        
+        atexit.unregister(self.close)
+    
+    @staticmethod
+    def _remove_database_files(path: str):
+        """Delete a database file and its WAL/shared-memory files, if present"""
+        for suffix in ('', '-wal', '-shm'):
+            try:
+                os.remove(path + suffix)
+            except OSError:
+                pass
+    
+    def _enable_wal(self):
+        """Switch the database to write-ahead logging (readers no longer block writers)"""
+        try:
+            conn = self._get_connection()
+            mode = conn.execute('PRAGMA journal_mode=WAL').fetchone()[0]
+            
+            if mode.lower() != 'wal':
+                self.logger.warning("WAL not available, using journal mode: %s", mode)
+                
+        except Exception as e:
+            self.logger.error("Failed to enable WAL mode: %s", e)
     
     def _create_tables(self):
         """Create database tables"""
         try:
-            with self._get_connection() as conn:
+            # Let cleanup hand freed pages back without a full VACUUM. The pragma
+            # only applies to a new file; existing ones are converted by one VACUUM below
+            conn = self._get_connection()
+            needs_vacuum = False
+            if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:  # 2 = INCREMENTAL
+                conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+                needs_vacuum = conn.execute('SELECT 1 FROM sqlite_master').fetchone() is not None
+            
+            with self._transaction() as conn:
                 cursor = conn.cursor()
+                version = cursor.execute('PRAGMA user_version').fetchone()[0]
+                
+                # v0 stored timestamps as CURRENT_TIMESTAMP text; move those tables
+                # aside and copy them into the new schema below
+                legacy = []
+                if version < 1:
+                    for table in self._TABLE_COLUMNS:
+                        if cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                                          (table,)).fetchone():
+                            cursor.execute(f'ALTER TABLE {table} RENAME TO {table}_v0')
+                            legacy.append(table)
                 
                 # User interactions table
                 cursor.execute('''
                     CREATE TABLE IF NOT EXISTS user_interactions (
                         id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                        timestamp INTEGER DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),  -- unix seconds
                         action TEXT NOT NULL,
                         color_r INTEGER,
                         color_g INTEGER,
                         color_b INTEGER,
-                        brightness INTEGER,
-                        hour INTEGER,
-                        day_of_week INTEGER
+                        brightness INTEGER
                     )
                 ''')
                 
@@ -61,189 +394,362 @@ class DatabaseManager:
                 cursor.execute('''
                     CREATE TABLE IF NOT EXISTS environmental_data (
                         id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                        timestamp INTEGER DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),  -- unix seconds
                         data_type TEXT NOT NULL,
                         value REAL,
                         details TEXT
                     )
                 ''')
                 
-                # System logs table
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS system_logs (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                        level TEXT,
-                        message TEXT
-                    )
-                ''')
+                for table in legacy:
+                    columns = ', '.join(self._TABLE_COLUMNS[table])
+                    cursor.execute(f'''
+                        INSERT INTO {table} (id, timestamp, {columns})
+                        SELECT id, CAST(strftime('%s', timestamp) AS INTEGER), {columns}
+                        FROM {table}_v0
+                    ''')
+                    cursor.execute(f'DROP TABLE {table}_v0')
+                
+                if legacy:
+                    self.logger.info("Migrated %s to integer timestamps", ', '.join(legacy))
+                
+                # v2: system_logs was never written to (logging goes to LOG_FILE_PATH)
+                if version < 2:
+                    cursor.execute('DROP TABLE IF EXISTS system_logs')
+                
+                # v3: details is plain JSON text again; convert rows that were stored as
+                # JSONB blobs (only readable by SQLite 3.45+, which wrote them)
+                if version < 3 and sqlite3.sqlite_version_info >= (3, 45, 0):
+                    cursor.execute("UPDATE environmental_data SET details = json(details) "
+                                   "WHERE typeof(details) = 'blob'")
+                
+                # Indexes for the timestamp range queries (reads and cleanup)
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_ui_ts ON user_interactions(timestamp)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_env_type_ts ON environmental_data(data_type, timestamp)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_env_ts ON environmental_data(timestamp)')
                 
-                conn.commit()
+                cursor.execute(f'PRAGMA user_version = {self._SCHEMA_VERSION}')
+                
+                # Refresh planner statistics once per startup
+                cursor.execute('ANALYZE')
+            
+            # One-time rewrite of a pre-existing file (after any migration above)
+            if needs_vacuum:
+                conn.execute('VACUUM')
+                self.logger.info("Database converted to incremental auto-vacuum")
+                
+        except Exception as e:
+            self.logger.error("Failed to create tables: %s", e)
+    
+    def _writer_loop(self):
+        """Background thread: drain queued writes and commit them in batches"""
+        running = True
+        while running:
+            batch = [self._write_queue.get()]
+            deadline = time.monotonic() + self._WRITE_BATCH_INTERVAL
+            
+            # Collect whatever else arrives within the batch window, unless a
+            # flush() or close() is waiting on the commit
+            while (len(batch) < self._WRITE_BATCH_SIZE and
+                   batch[-1] is not None and batch[-1] is not self._FLUSH):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._write_queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            
+            if None in batch:
+                running = False
+            
+            rows = [item for item in batch if item is not None and item is not self._FLUSH]
+            if rows:
+                self._write_batch(rows)
+            
+            for _ in batch:
+                self._write_queue.task_done()
+    
+    def _write_batch(self, rows: List[Tuple[str, str, tuple]]):
+        """Insert queued rows, one executemany per statement, in a single transaction"""
+        grouped = {}
+        for table, sql, params in rows:
+            grouped.setdefault((table, sql), []).append(params)
+        
+        try:
+            with self._counts_lock:
+                self._with_retry(self._insert_grouped, grouped)
                 
+                if self._counts is not None:
+                    for (table, sql), params_list in grouped.items():
+                        self._counts[table] += len(params_list)
+                    
         except Exception as e:
-            self.logger.error(f"Failed to create tables: {e}")
+            self.logger.error("Failed to write %d queued records: %s", len(rows), e)
+    
+    def _insert_grouped(self, grouped: Dict[Tuple[str, str], List[tuple]]):
+        """Run one executemany per (table, sql) group inside a single transaction"""
+        with self._transaction() as conn:
+            for (table, sql), params_list in grouped.items():
+                conn.executemany(sql, params_list)
+    
+    def _enqueue(self, item) -> bool:
+        """Queue an item for the writer thread; False once close() has started"""
+        with self._closing_lock:
+            if self._closing:
+                return False
+            self._write_queue.put(item)
+            return True
+    
+    def flush(self):
+        """Block until every queued write has been committed"""
+        writer = getattr(self, '_writer_thread', None)
+        if not writer or not writer.is_alive():
+            return
+        
+        # commit now instead of at the end of the window
+        if self._enqueue(self._FLUSH):
+            self._write_queue.join()
+        else:
+            # Closing: the writer drains what is queued and exits; wait for that instead
+            writer.join(timeout=5)
+    
+    def _queue_row(self, row: Tuple[str, str, tuple]):
+        """Queue a row for the writer thread, or write it directly once closing"""
+        if not self._enqueue(row):
+            self._write_batch([row])
     
     def log_user_action(self, action: str, color: Tuple[int, int, int] = None, brightness: int = None):
-        """Log user interaction"""
+        """Log user interaction (queued; committed by the writer thread)"""
         try:
-            now = datetime.now()
             r, g, b = color if color else (None, None, None)
             
-            with self._get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    INSERT INTO user_interactions 
-                    (action, color_r, color_g, color_b, brightness, hour, day_of_week)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (action, r, g, b, brightness, now.hour, now.weekday()))
-                conn.commit()
+            self._queue_row(('user_interactions', self._INSERT_USER_ACTION_SQL,
+                             (int(time.time()), action, r, g, b, brightness)))
+                
+        except Exception as e:
+            self.logger.error("Failed to log user action: %s", e)
+    
+    def log_user_actions(self, actions: List[Tuple[str, Optional[Tuple[int, int, int]], Optional[int]]]):
+        """Log a list of (action, color, brightness) interactions in one transaction (synchronous)"""
+        self.flush()  # keep them after any still-queued single actions
+        try:
+            now = int(time.time())
+            rows = []
+            for action, color, brightness in actions:
+                r, g, b = color if color else (None, None, None)
+                rows.append(('user_interactions', self._INSERT_USER_ACTION_SQL,
+                             (now, action, r, g, b, brightness)))
+            
+            if rows:
+                self._write_batch(rows)
                 
         except Exception as e:
-            self.logger.error(f"Failed to log user action: {e}")
+            self.logger.error("Failed to log user actions: %s", e)
     
     def log_environmental_data(self, data_type: str, value: float, details: Dict = None):
-        """Log environmental sensor data"""
+        """Log environmental sensor data (queued; committed by the writer thread)"""
+        try:
+            self._queue_row(('environmental_data', self._INSERT_ENV_SQL,
+                             (int(time.time()), data_type, value, _encode_details(details))))
+                
+        except Exception as e:
+            self.logger.error("Failed to log environmental data: %s", e)
+    
+    def log_environmental_data_batch(self, readings: List[Tuple[str, float, Optional[Dict]]]):
+        """Log a list of (data_type, value, details) readings in one transaction (synchronous)"""
+        self.flush()  # keep them after any still-queued single readings
         try:
-            details_json = json.dumps(details) if details else None
+            now = int(time.time())
+            rows = [('environmental_data', self._INSERT_ENV_SQL,
+                     (now, data_type, value, _encode_details(details)))
+                    for data_type, value, details in readings]
             
-            with self._get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    INSERT INTO environmental_data (data_type, value, details)
-                    VALUES (?, ?, ?)
-                ''', (data_type, value, details_json))
-                conn.commit()
+            if rows:
+                self._write_batch(rows)
                 
         except Exception as e:
-            self.logger.error(f"Failed to log environmental data: {e}")
+            self.logger.error("Failed to log environmental data batch: %s", e)
     
     def get_user_patterns(self, days: int = 7) -> List[Dict]:
         """Get user interaction patterns for ML training"""
+        self.flush()
         try:
-            with self._get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT action, color_r, color_g, color_b, brightness, hour, day_of_week, timestamp
-                    FROM user_interactions
-                    WHERE timestamp >= datetime('now', '-{} days')
-                    ORDER BY timestamp
-                '''.format(days))
-                
-                rows = cursor.fetchall()
-                
-                patterns = []
-                for row in rows:
-                    patterns.append({
-                        'action': row[0],
-                        'color': (row[1], row[2], row[3]) if row[1] is not None else None,
-                        'brightness': row[4],
-                        'hour': row[5],
-                        'day_of_week': row[6],
-                        'timestamp': row[7]
-                    })
-                
-                return patterns
-                
+            cursor = self._get_connection(readonly=True).cursor()
+            cursor.execute('''
+                SELECT action, color_r, color_g, color_b, brightness, timestamp,
+                       CAST(strftime('%H', timestamp, 'unixepoch', 'localtime') AS INTEGER) AS hour,
+                       (CAST(strftime('%w', timestamp, 'unixepoch', 'localtime') AS INTEGER) + 6) % 7 AS day_of_week
+                FROM user_interactions
+                WHERE timestamp >= CAST(strftime('%s', 'now', ?) AS INTEGER)
+                ORDER BY timestamp
+            ''', (f'-{days} days',))
+            
+            fromtimestamp = datetime.fromtimestamp
+            return [{
+                'action': action,
+                'color': (r, g, b) if r is not None else None,
+                'brightness': brightness,
+                'hour': hour,
+                'day_of_week': day_of_week,
+                'timestamp': fromtimestamp(ts).isoformat(sep=' ')
+            } for action, r, g, b, brightness, ts, hour, day_of_week in cursor]
+            
         except Exception as e:
-            self.logger.error(f"Failed to get user patterns: {e}")
+            self.logger.error("Failed to get user patterns: %s", e)
             return []
     
+    def count_user_interactions(self, days: int = 7) -> int:
+        """Count user interactions from the last N days without loading them"""
+        self.flush()
+        try:
+            return self._get_connection(readonly=True).execute(
+                "SELECT COUNT(*) FROM user_interactions WHERE timestamp >= CAST(strftime('%s', 'now', ?) AS INTEGER)",
+                (f'-{days} days',)
+            ).fetchone()[0]
+
+        except Exception as e:
+            self.logger.error("Failed to count user interactions: %s", e)
+            return 0
+
+    def get_user_pattern_array(self, days: int = 7) -> np.ndarray:
+        """Get user interaction patterns as a structured array (see PATTERN_DTYPE)"""
+        self.flush()
+        try:
+            cursor = self._get_connection(readonly=True).cursor()
+            cursor.execute('''
+                SELECT action,
+                       COALESCE(color_r, -1), COALESCE(color_g, -1), COALESCE(color_b, -1),
+                       COALESCE(brightness, -1),
+                       CAST(strftime('%H', timestamp, 'unixepoch', 'localtime') AS INTEGER),
+                       (CAST(strftime('%w', timestamp, 'unixepoch', 'localtime') AS INTEGER) + 6) % 7,
+                       timestamp
+                FROM user_interactions
+                WHERE timestamp >= CAST(strftime('%s', 'now', ?) AS INTEGER)
+                ORDER BY timestamp
+            ''', (f'-{days} days',))
+            
+            return np.fromiter(cursor, dtype=self.PATTERN_DTYPE)
+            
+        except Exception as e:
+            self.logger.error("Failed to get user pattern array: %s", e)
+            return np.empty(0, dtype=self.PATTERN_DTYPE)
+    
     def get_environmental_data(self, data_type: str = None, hours: int = 24) -> List[Dict]:
         """Get recent environmental data"""
+        self.flush()
         try:
-            with self._get_connection() as conn:
-                cursor = conn.cursor()
-                
-                if data_type:
-                    cursor.execute('''
-                        SELECT data_type, value, details, timestamp
-                        FROM environmental_data
-                        WHERE data_type = ? AND timestamp >= datetime('now', '-{} hours')
-                        ORDER BY timestamp DESC
-                    '''.format(hours), (data_type,))
-                else:
-                    cursor.execute('''
-                        SELECT data_type, value, details, timestamp
-                        FROM environmental_data
-                        WHERE timestamp >= datetime('now', '-{} hours')
-                        ORDER BY timestamp DESC
-                    '''.format(hours))
-                
-                rows = cursor.fetchall()
-                
-                data = []
-                for row in rows:
-                    details = json.loads(row[2]) if row[2] else {}
-                    data.append({
-                        'type': row[0],
-                        'value': row[1],
-                        'details': details,
-                        'timestamp': row[3]
-                    })
-                
-                return data
-                
+            cursor = self._get_connection(readonly=True).cursor()
+            
+            if data_type:
+                cursor.execute('''
+                    SELECT data_type, value, details, timestamp
+                    FROM environmental_data
+                    WHERE data_type = ? AND timestamp >= CAST(strftime('%s', 'now', ?) AS INTEGER)
+                    ORDER BY timestamp DESC
+                ''', (data_type, f'-{hours} hours'))
+            else:
+                cursor.execute('''
+                    SELECT data_type, value, details, timestamp
+                    FROM environmental_data
+                    WHERE timestamp >= CAST(strftime('%s', 'now', ?) AS INTEGER)
+                    ORDER BY timestamp DESC
+                ''', (f'-{hours} hours',))
+            
+            fromtimestamp = datetime.fromtimestamp
+            return [{
+                'type': data_type,
+                'value': value,
+                'details': _loads(details) if details else {},
+                'timestamp': fromtimestamp(ts).isoformat(sep=' ')
+            } for data_type, value, details, ts in cursor]
+            
         except Exception as e:
-            self.logger.error(f"Failed to get environmental data: {e}")
+            self.logger.error("Failed to get environmental data: %s", e)
             return []
     
     def get_stats(self) -> Dict:
-        """Get database statistics"""
+        """Get database statistics (rows still queued for the writer are not counted yet)"""
         try:
-            with self._get_connection() as conn:
-                cursor = conn.cursor()
-                
-                # Count records in each table
-                cursor.execute('SELECT COUNT(*) FROM user_interactions')
-                user_count = cursor.fetchone()[0]
-                
-                cursor.execute('SELECT COUNT(*) FROM environmental_data')
-                env_count = cursor.fetchone()[0]
-                
-                cursor.execute('SELECT COUNT(*) FROM system_logs')
-                log_count = cursor.fetchone()[0]
-                
-                return {
-                    'user_interactions': user_count,
-                    'environmental_data': env_count,
-                    'system_logs': log_count,
-                    'database_size': os.path.getsize(self.db_path) if os.path.exists(self.db_path) else 0
-                }
-                
+            if self._counts is None:
+                with self._counts_lock:
+                    if self._counts is None:
+                        # Count records in each table (first call only)
+                        cursor = self._get_connection(readonly=True).cursor()
+                        self._counts = {
+                            table: cursor.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                            for table in ('user_interactions', 'environmental_data')
+                        }
+            
+            # Once counted, copy without the lock so stats never wait on a commit
+            # (dict() copies in one C call under the GIL)
+            counts = dict(self._counts)
+            
+            # Logical size as SQLite sees it (includes pages still only in the WAL)
+            size = self._get_connection(readonly=True).execute(
+                'SELECT page_count * page_size FROM pragma_page_count(), pragma_page_size()'
+            ).fetchone()[0]
+            
+            return {
+                **counts,
+                'database_size': size
+            }
+            
         except Exception as e:
-            self.logger.error(f"Failed to get stats: {e}")
+            self.logger.error("Failed to get stats: %s", e)
             return {}
     
     def cleanup_old_data(self, days: int = 30):
         """Remove old data to keep database size manageable"""
+        self.flush()
         try:
-            with self._get_connection() as conn:
-                cursor = conn.cursor()
-                
-                # Keep only recent data
-                cursor.execute('''
-                    DELETE FROM user_interactions 
-                    WHERE timestamp < datetime('now', '-{} days')
-                '''.format(days))
-                
-                cursor.execute('''
-                    DELETE FROM environmental_data 
-                    WHERE timestamp < datetime('now', '-{} days')
-                '''.format(days))
-                
-                cursor.execute('''
-                    DELETE FROM system_logs 
-                    WHERE timestamp < datetime('now', '-{} days')
-                '''.format(days))
-                
-                # Vacuum to reclaim space
-                cursor.execute('VACUUM')
-                conn.commit()
+            cutoff = f'-{days} days'
+            
+            with self._counts_lock:
+                deleted = self._with_retry(self._delete_older_than, cutoff)
                 
-                self.logger.info(f"Cleaned up data older than {days} days")
+                if self._counts is not None:
+                    for table, n in deleted.items():
+                        self._counts[table] -= n
+            
+            # Release up to 1000 free pages. executescript() steps the pragma to
+            # completion; execute() would stop after the first page
+            self._get_connection().executescript('PRAGMA incremental_vacuum(1000);')
+            
+            # Fold the WAL back into the database file and reset it to zero bytes
+            self._get_connection().execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            
+            # Refresh planner statistics if the deletes changed the tables enough to matter
+            self._get_connection().execute('PRAGMA optimize')
+            
+            self.logger.info("Cleaned up data older than %d days", days)
                 
         except Exception as e:
-            self.logger.error(f"Failed to cleanup old data: {e}")
+            self.logger.error("Failed to cleanup old data: %s", e)
+    
+    def _delete_older_than(self, cutoff: str) -> Dict[str, int]:
+        """Delete rows older than the cutoff modifier in one transaction; returns rows deleted per table"""
+        with self._transaction() as conn:
+            cursor = conn.cursor()
+            deleted = {}
+            
+            # Keep only recent data
+            for table, sql in self._DELETE_OLDER_THAN_SQL.items():
+                cursor.execute(sql, (cutoff,))
+                deleted[table] = cursor.rowcount
+        
+        return deleted
+    
+    def vacuum(self):
+        """Rewrite the whole database file (occasional maintenance, e.g. monthly)"""
+        self.flush()
+        try:
+            # Not allowed inside a transaction
+            self._get_connection().execute('VACUUM')
+            self.logger.info("Database vacuumed")
+            
+        except Exception as e:
+            self.logger.error("Failed to vacuum database: %s", e)
 
 # Standalone testing
 if __name__ == "__main__":
@@ -256,12 +762,17 @@ if __name__ == "__main__":
     
     # Test logging user actions
     db.log_user_action("TURN_ON", (255, 0, 0), 80)
-    db.log_user_action("COLOR_CHANGE", (0, 255, 0), 75)
-    db.log_user_action("TURN_OFF")
+    db.log_user_actions([
+        ("COLOR_CHANGE", (0, 255, 0), 75),
+        ("TURN_OFF", None, None),
+    ])
     
     # Test logging environmental data
     db.log_environmental_data("temperature", 22.5, {"location": "room"})
-    db.log_environmental_data("air_quality", 85, {"aqi_level": 2})
+    db.log_environmental_data_batch([
+        ("air_quality", 85, {"aqi_level": 2}),
+        ("humidity", 40, None),
+    ])
     
     # Get patterns
     patterns = db.get_user_patterns(1)
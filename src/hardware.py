@@ -16,6 +16,8 @@ import threading
 import logging
 from typing import Tuple, Callable, Optional
 
+import numpy as np
+
 try:
     import RPi.GPIO as GPIO
     import spidev
@@ -28,8 +30,57 @@ except ImportError:
     RASPBERRY_PI = False
     print("Warning: Running in simulation mode (not on Raspberry Pi)")
 
+try:
+    import pigpio
+    PIGPIO_AVAILABLE = True
+except ImportError:
+    # Fall back to RPi.GPIO software PWM
+    PIGPIO_AVAILABLE = False
+
 from config import hardware, settings
 
+PWM_FREQUENCY = 1000  # Hz
+PIGPIO_PWM_RANGE = 1000  # Duty cycle resolution for pigpio DMA PWM
+
+# BCM pins usable with pigpio hardware_PWM, mapped to their PWM channel
+HARDWARE_PWM_CHANNELS = {12: 0, 18: 0, 13: 1, 19: 1}
+STRIP_PWM_CHANNEL = 0  # Used by the NeoPixel strip on board.D18
+
+ADC_CACHE_TIME = 0.02  # Reuse potentiometer samples younger than 20ms
+
+ALERT_FREQUENCY = 1000  # Hz
+ALERT_SAMPLE_RATE = 22050
+ALERT_AMPLITUDE = 4096
+ALERT_DURATIONS = (0.25, 0.5, 1.0, 2.0)  # Tones prebuilt at startup, in seconds
+
+RENDER_INTERVAL = 1 / 60  # Apply LED changes at most 60 times per second
+
+
+class _PigpioPWM:
+    """pigpio-backed PWM channel with the RPi.GPIO PWM interface"""
+    
+    def __init__(self, pi, pin: int, hardware_pwm: bool):
+        self.pi = pi
+        self.pin = pin
+        self.hardware_pwm = hardware_pwm
+        if not hardware_pwm:
+            pi.set_PWM_frequency(pin, PWM_FREQUENCY)
+            pi.set_PWM_range(pin, PIGPIO_PWM_RANGE)
+    
+    def start(self, duty_cycle: float):
+        self.ChangeDutyCycle(duty_cycle)
+    
+    def ChangeDutyCycle(self, duty_cycle: float):
+        if self.hardware_pwm:
+            # hardware_PWM takes duty in millionths
+            self.pi.hardware_PWM(self.pin, PWM_FREQUENCY, int(duty_cycle * 10000))
+        else:
+            self.pi.set_PWM_dutycycle(self.pin, int(duty_cycle * PIGPIO_PWM_RANGE / 100))
+    
+    def stop(self):
+        self.ChangeDutyCycle(0)
+
+
 class HardwareController:
     """Independent hardware controller for Smart Lamp"""
     
@@ -42,6 +93,27 @@ class HardwareController:
         self.current_color = (255, 255, 255)  # Default white
         self.current_brightness = settings.DEFAULT_BRIGHTNESS
         
+        # Persistent PWM channels per RGB LED: {led_num: (red, green, blue)}
+        self.pwm_channels = {}
+        self.pi = None
+        
+        # Last potentiometer sample as (monotonic time, brightness)
+        self._last_adc = (0.0, None)
+        
+        # Alert tone Sound objects keyed by duration
+        self._alert_sounds = {}
+        
+        # Desired and applied (r, g, b, brightness) per output (LED 1-3 or 'strip').
+        # Setters only update _desired; the render thread writes the differences.
+        self._desired = {}
+        self._applied = {}
+        self._force_refresh = False
+        self._state_lock = threading.Lock()
+        self._render_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._rendering = False
+        self.render_thread = None
+        
         # Button callback functions
         self.power_callback = None
         self.color_callback = None
@@ -50,6 +122,7 @@ class HardwareController:
         # Threading control
         self.running = False
         self.button_thread = None
+        self._stop_event = threading.Event()
         
         # Initialize hardware if on Raspberry Pi
         if RASPBERRY_PI:
@@ -58,6 +131,8 @@ class HardwareController:
             self._setup_led_strip()
             self._setup_audio()
         
+        self._start_render_thread()
+        
         self.is_initialized = True
         self.logger.info("Hardware controller initialized")
     
@@ -67,12 +142,37 @@ class HardwareController:
             GPIO.setmode(GPIO.BCM)
             GPIO.setwarnings(False)
             
-            # Setup RGB LED pins as outputs
+            # Prefer pigpio (DMA/hardware PWM) when its daemon is running
+            if PIGPIO_AVAILABLE:
+                self.pi = pigpio.pi()
+                if not self.pi.connected:
+                    self.logger.warning("pigpio daemon not running, using RPi.GPIO software PWM")
+                    self.pi = None
+            
+            # Hardware PWM is opt-in (the Pi's analog audio shares the PWM peripheral)
+            # and never uses the strip's or the speaker's channel
+            free_channels = set()
+            if self.pi and hardware.RGB_HARDWARE_PWM:
+                free_channels = set(HARDWARE_PWM_CHANNELS.values()) - {
+                    STRIP_PWM_CHANNEL, HARDWARE_PWM_CHANNELS.get(hardware.SPEAKER_PIN)}
+            
+            # Setup RGB LED pins with one PWM channel per pin
             for led_num in [1, 2, 3]:
-                r, g, b = hardware.get_rgb_led_pins(led_num)
-                GPIO.setup(r, GPIO.OUT)
-                GPIO.setup(g, GPIO.OUT)
-                GPIO.setup(b, GPIO.OUT)
+                channels = []
+                for pin in hardware.get_rgb_led_pins(led_num):
+                    if self.pi:
+                        # Each hardware PWM channel can only drive one pin
+                        channel = HARDWARE_PWM_CHANNELS.get(pin)
+                        use_hardware = channel in free_channels
+                        if use_hardware:
+                            free_channels.discard(channel)
+                        pwm = _PigpioPWM(self.pi, pin, use_hardware)
+                    else:
+                        GPIO.setup(pin, GPIO.OUT)
+                        pwm = GPIO.PWM(pin, PWM_FREQUENCY)
+                    pwm.start(0)
+                    channels.append(pwm)
+                self.pwm_channels[led_num] = tuple(channels)
             
             # Setup button pins as inputs with pull-up resistors
             for button_pin in hardware.get_all_button_pins():
@@ -91,7 +191,8 @@ class HardwareController:
         try:
             self.spi = spidev.SpiDev()
             self.spi.open(0, 0)  # Bus 0, Device 0
-            self.spi.max_speed_hz = 1350000
+            self.spi.max_speed_hz = hardware.MCP3008_SPI_SPEED
+            self.spi.mode = 0
             self.logger.info("SPI setup completed")
         except Exception as e:
             self.logger.error(f"SPI setup failed: {e}")
@@ -117,65 +218,122 @@ class HardwareController:
         """Setup audio system"""
         try:
             pygame.mixer.init()
+            
+            # Prebuild the alert tones so playing one is a single play() call
+            for duration in ALERT_DURATIONS:
+                self._alert_sounds[duration] = pygame.sndarray.make_sound(
+                    self._build_tone(ALERT_FREQUENCY, duration))
+            
             self.logger.info("Audio system setup completed")
         except Exception as e:
             self.logger.error(f"Audio setup failed: {e}")
     
+    def _start_render_thread(self):
+        """Start the thread that writes LED state changes to the hardware"""
+        self._rendering = True
+        self.render_thread = threading.Thread(target=self._render_loop)
+        self.render_thread.daemon = True
+        self.render_thread.start()
+    
+    def _stop_render_thread(self):
+        """Stop the render thread after applying any pending LED state"""
+        self._rendering = False
+        self._wake.set()
+        if self.render_thread:
+            self.render_thread.join(timeout=1)
+            self.render_thread = None
+        self._apply_state()
+    
+    def _render_loop(self):
+        """Apply desired LED state, coalescing bursts of changes"""
+        while self._rendering:
+            self._wake.wait()
+            self._wake.clear()
+            self._apply_state()
+            time.sleep(RENDER_INTERVAL)
+    
+    def _apply_state(self):
+        """Write every output whose desired state differs from the applied one"""
+        with self._state_lock:
+            desired = dict(self._desired)
+            force = self._force_refresh
+            self._force_refresh = False
+        
+        with self._render_lock:
+            for output, state in desired.items():
+                if not force and self._applied.get(output) == state:
+                    continue
+                if output == 'strip':
+                    applied = self._write_led_strip(*state)
+                else:
+                    applied = self._write_rgb_led(output, *state)
+                if applied:
+                    self._applied[output] = state
+    
+    def _queue_state(self, output, r: int, g: int, b: int):
+        """Record the desired color of an output and wake the render thread"""
+        with self._state_lock:
+            self._desired[output] = (r, g, b, self.current_brightness)
+        self._wake.set()
+    
     def set_rgb_led(self, led_number: int, r: int, g: int, b: int):
         """Set color for specific RGB LED (1, 2, or 3)"""
+        if led_number not in (1, 2, 3):
+            self.logger.error(f"Failed to set RGB LED {led_number}: LED number must be 1, 2, or 3")
+            return False
+        
+        self._queue_state(led_number, r, g, b)
+        self.current_color = (r, g, b)
+        return True
+    
+    def set_all_leds(self, r: int, g: int, b: int):
+        """Set color for all RGB LEDs"""
+        success = True
+        for led_num in [1, 2, 3]:
+            if not self.set_rgb_led(led_num, r, g, b):
+                success = False
+        return success
+    
+    def set_led_strip(self, r: int, g: int, b: int):
+        """Set color for entire LED strip"""
+        self._queue_state('strip', r, g, b)
+        return True
+    
+    def _write_rgb_led(self, led_number: int, r: int, g: int, b: int, brightness: int):
+        """Write color and brightness to the PWM channels of an RGB LED"""
         if not RASPBERRY_PI:
             self.logger.info(f"SIMULATION: LED {led_number} set to RGB({r}, {g}, {b})")
             return True
         
         try:
-            red_pin, green_pin, blue_pin = hardware.get_rgb_led_pins(led_number)
-            
-            # Convert 0-255 values to PWM duty cycle (0-100)
-            red_pwm = GPIO.PWM(red_pin, 1000)
-            green_pwm = GPIO.PWM(green_pin, 1000)
-            blue_pwm = GPIO.PWM(blue_pin, 1000)
+            red_pwm, green_pwm, blue_pwm = self.pwm_channels[led_number]
             
-            red_pwm.start(0)
-            green_pwm.start(0)
-            blue_pwm.start(0)
-            
-            # Apply brightness
-            brightness_factor = self.current_brightness / 100.0
+            # Convert 0-255 values to PWM duty cycle (0-100) and apply brightness
+            brightness_factor = brightness / 100.0
             red_pwm.ChangeDutyCycle((r / 255.0) * 100 * brightness_factor)
             green_pwm.ChangeDutyCycle((g / 255.0) * 100 * brightness_factor)
             blue_pwm.ChangeDutyCycle((b / 255.0) * 100 * brightness_factor)
-            
-            self.current_color = (r, g, b)
             return True
             
         except Exception as e:
             self.logger.error(f"Failed to set RGB LED {led_number}: {e}")
             return False
     
-    def set_all_leds(self, r: int, g: int, b: int):
-        """Set color for all RGB LEDs"""
-        success = True
-        for led_num in [1, 2, 3]:
-            if not self.set_rgb_led(led_num, r, g, b):
-                success = False
-        return success
-    
-    def set_led_strip(self, r: int, g: int, b: int):
-        """Set color for entire LED strip using neopixel library"""
+    def _write_led_strip(self, r: int, g: int, b: int, brightness: int):
+        """Write color and brightness to the whole LED strip using neopixel library"""
         if not RASPBERRY_PI or not self.led_strip:
             self.logger.info(f"SIMULATION: LED strip set to RGB({r}, {g}, {b})")
             return True
         
         try:
             # Apply brightness factor
-            brightness_factor = self.current_brightness / 100.0
+            brightness_factor = brightness / 100.0
             adjusted_r = int(r * brightness_factor)
             adjusted_g = int(g * brightness_factor)
             adjusted_b = int(b * brightness_factor)
             
-            # Set all pixels to the same color
-            for i in range(len(self.led_strip)):
-                self.led_strip[i] = (adjusted_r, adjusted_g, adjusted_b)
+            # Set all pixels to the same color in one buffer fill
+            self.led_strip.fill((adjusted_r, adjusted_g, adjusted_b))
             
             # Update the strip
             self.led_strip.show()
@@ -187,6 +345,9 @@ class HardwareController:
     
     def turn_off_all_leds(self):
         """Turn off all LEDs"""
+        # Always push the off state to the hardware
+        with self._state_lock:
+            self._force_refresh = True
         self.set_all_leds(0, 0, 0)
         self.set_led_strip(0, 0, 0)
         self.lamp_on = False
@@ -209,6 +370,11 @@ class HardwareController:
             import random
             return random.randint(0, 100)
         
+        now = time.monotonic()
+        last_time, last_value = self._last_adc
+        if last_value is not None and now - last_time < ADC_CACHE_TIME:
+            return last_value
+        
         try:
             # Read from MCP3008 channel
             channel = hardware.BRIGHTNESS_CHANNEL
@@ -220,6 +386,7 @@ class HardwareController:
             brightness = max(settings.MIN_BRIGHTNESS, 
                            min(settings.MAX_BRIGHTNESS, brightness))
             
+            self._last_adc = (now, brightness)
             return brightness
             
         except Exception as e:
@@ -260,12 +427,25 @@ class HardwareController:
         self.mode_callback = callback
     
     def start_button_monitoring(self):
-        """Start monitoring buttons in a separate thread"""
+        """Start edge-triggered button handling and brightness monitoring"""
         if self.button_thread and self.button_thread.is_alive():
             return
         
         self.running = True
-        self.button_thread = threading.Thread(target=self._button_monitor_loop)
+        self._stop_event.clear()
+        
+        if RASPBERRY_PI:
+            # Kernel-side edge detection and debounce, no polling needed
+            bouncetime = int(hardware.BUTTON_DEBOUNCE_TIME * 1000)
+            for button_pin in hardware.get_all_button_pins():
+                try:
+                    GPIO.add_event_detect(button_pin, GPIO.FALLING,
+                                          callback=self._on_button_edge,
+                                          bouncetime=bouncetime)
+                except Exception as e:
+                    self.logger.error(f"Failed to enable events for button {button_pin}: {e}")
+        
+        self.button_thread = threading.Thread(target=self._brightness_monitor_loop)
         self.button_thread.daemon = True
         self.button_thread.start()
         self.logger.info("Button monitoring started")
@@ -273,49 +453,44 @@ class HardwareController:
     def stop_button_monitoring(self):
         """Stop button monitoring"""
         self.running = False
+        self._stop_event.set()
+        
+        if RASPBERRY_PI:
+            for button_pin in hardware.get_all_button_pins():
+                try:
+                    GPIO.remove_event_detect(button_pin)
+                except Exception:
+                    pass
+        
         if self.button_thread:
             self.button_thread.join(timeout=1)
         self.logger.info("Button monitoring stopped")
     
-    def _button_monitor_loop(self):
-        """Main button monitoring loop"""
-        last_power_press = 0
-        last_color_press = 0
-        last_mode_press = 0
+    def _on_button_edge(self, channel: int):
+        """Dispatch a debounced button press to its callback"""
+        if channel == hardware.POWER_BUTTON:
+            callback = self.power_callback
+        elif channel == hardware.COLOR_BUTTON:
+            callback = self.color_callback
+        elif channel == hardware.MODE_BUTTON:
+            callback = self.mode_callback
+        else:
+            return
         
-        while self.running:
+        try:
+            if callback:
+                callback()
+        except Exception as e:
+            self.logger.error(f"Error in button {channel} callback: {e}")
+    
+    def _brightness_monitor_loop(self):
+        """Update brightness from the potentiometer every 200ms"""
+        while not self._stop_event.wait(0.2):
             try:
-                current_time = time.time()
-                
-                # Check power button
-                if (self.is_button_pressed(hardware.POWER_BUTTON) and 
-                    current_time - last_power_press > hardware.BUTTON_DEBOUNCE_TIME):
-                    last_power_press = current_time
-                    if self.power_callback:
-                        self.power_callback()
-                
-                # Check color button
-                if (self.is_button_pressed(hardware.COLOR_BUTTON) and 
-                    current_time - last_color_press > hardware.BUTTON_DEBOUNCE_TIME):
-                    last_color_press = current_time
-                    if self.color_callback:
-                        self.color_callback()
-                
-                # Check mode button
-                if (self.is_button_pressed(hardware.MODE_BUTTON) and 
-                    current_time - last_mode_press > hardware.BUTTON_DEBOUNCE_TIME):
-                    last_mode_press = current_time
-                    if self.mode_callback:
-                        self.mode_callback()
-                
-                # Update brightness continuously
                 self.update_brightness()
-                
-                time.sleep(0.1)  # Check every 100ms
-                
             except Exception as e:
-                self.logger.error(f"Error in button monitoring: {e}")
-                time.sleep(1)
+                self.logger.error(f"Error in brightness monitoring: {e}")
+                self._stop_event.wait(1)
     
     def play_alert_sound(self, duration: float = 1.0):
         """Play alert sound"""
@@ -324,23 +499,31 @@ class HardwareController:
             return
         
         try:
-            # Generate a simple beep tone
-            frequency = 1000  # Hz
-            sample_rate = 22050
-            frames = int(duration * sample_rate)
-            
-            arr = []
-            for i in range(frames):
-                wave = 4096 * (i % (sample_rate // frequency) < (sample_rate // frequency) // 2)
-                arr.append([wave, wave])
-            
-            sound = pygame.sndarray.make_sound(arr)
-            sound.play()
+            sound = self._alert_sounds.get(duration)
+            if sound is not None:
+                sound.play()
+            else:
+                # Trim the shortest prebuilt tone that is long enough
+                longer = [d for d in self._alert_sounds if d > duration]
+                if longer:
+                    self._alert_sounds[min(longer)].play(maxtime=int(duration * 1000))
+                else:
+                    sound = pygame.sndarray.make_sound(self._build_tone(ALERT_FREQUENCY, duration))
+                    self._alert_sounds[duration] = sound
+                    sound.play()
             time.sleep(duration)
             
         except Exception as e:
             self.logger.error(f"Failed to play alert sound: {e}")
     
+    def _build_tone(self, frequency: int, duration: float) -> np.ndarray:
+        """Build a stereo square-wave tone as an int16 sample array"""
+        period = ALERT_SAMPLE_RATE // frequency
+        frames = int(duration * ALERT_SAMPLE_RATE)
+        t = np.arange(frames, dtype=np.int32)
+        mono = np.where(t % period < period // 2, ALERT_AMPLITUDE, 0).astype(np.int16)
+        return np.repeat(mono[:, None], 2, axis=1)
+    
     def blink_leds(self, r: int, g: int, b: int, times: int = 3, interval: float = 0.5):
         """Blink LEDs with specified color"""
         original_state = self.lamp_on
@@ -374,20 +557,25 @@ class HardwareController:
                     pos -= 170
                     return (0, pos * 3, 255 - pos * 3)
             
+            # Precompute brightness-adjusted wheel colors and pixel offsets once
+            brightness_factor = self.current_brightness / 100.0
+            palette = [tuple(int(c * brightness_factor) for c in wheel(pos)) for pos in range(256)]
+            num_pixels = len(self.led_strip)
+            offsets = [i * 256 // num_pixels for i in range(num_pixels)]
+            
             for cycle in range(cycles):
                 for j in range(256):
-                    for i in range(len(self.led_strip)):
-                        pixel_index = (i * 256 // len(self.led_strip)) + j
-                        color = wheel(pixel_index & 255)
-                        # Apply brightness
-                        brightness_factor = self.current_brightness / 100.0
-                        adjusted_color = tuple(int(c * brightness_factor) for c in color)
-                        self.led_strip[i] = adjusted_color
-                    self.led_strip.show()
+                    with self._render_lock:
+                        self.led_strip[:] = [palette[(offset + j) & 255] for offset in offsets]
+                        self.led_strip.show()
                     time.sleep(wait_ms / 1000.0)
                     
         except Exception as e:
             self.logger.error(f"Rainbow effect failed: {e}")
+        finally:
+            # The strip no longer shows its solid color after this effect
+            with self._render_lock:
+                self._applied.pop('strip', None)
     
     def get_status(self) -> dict:
         """Get current hardware status"""
@@ -401,15 +589,31 @@ class HardwareController:
     
     def cleanup(self):
         """Clean up hardware resources"""
+        if not self.is_initialized:
+            return
+        
         self.stop_button_monitoring()
         
         if RASPBERRY_PI:
             self.turn_off_all_leds()
+        
+        # Flush pending LED state before releasing the pins
+        self._stop_render_thread()
+        
+        if RASPBERRY_PI:
+            for channels in self.pwm_channels.values():
+                for pwm in channels:
+                    pwm.stop()
+            self.pwm_channels.clear()
+            if self.pi:
+                self.pi.stop()
+                self.pi = None
             GPIO.cleanup()
             
             if self.spi:
                 self.spi.close()
         
+        self.is_initialized = False
         self.logger.info("Hardware cleanup completed")
     
     def __del__(self):
@@ -14,6 +14,7 @@ import logging
 import pickle
 import os
 import numpy as np
+from pathlib import Path
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Optional
 from sklearn.svm import SVC
@@ -43,58 +44,35 @@ class MLManager:
         self.model_accuracy = 0.0
         
         # Create models directory
-        os.makedirs(os.path.dirname(settings.ML_MODEL_PATH), exist_ok=True)
+        Path(settings.ML_MODEL_PATH).parent.mkdir(parents=True, exist_ok=True)
         
         # Load existing models if available
         self._load_models()
         
         self.logger.info("ML Manager initialized")
     
-    def _prepare_features(self, patterns: List[Dict]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
-        """Convert user patterns to ML features"""
-        if not patterns:
-            return np.array([]), np.array([]), np.array([])
+    def _prepare_feature_arrays(self, patterns: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Convert DatabaseManager.get_user_pattern_array() output to ML features and labels"""
+        brightness = np.where(patterns['brightness'] >= 0, patterns['brightness'], 50)
+        features = np.column_stack((patterns['hour'], patterns['day_of_week'], brightness))
         
-        features = []
-        power_labels = []
-        color_labels = []
+        # Power labels: 1 for ON, 0 for OFF
+        power_labels = np.isin(patterns['action'], ['TURN_ON', 'COLOR_CHANGE']).astype(int)
         
-        for pattern in patterns:
-            # Features: hour, day_of_week, brightness
-            feature = [
-                pattern['hour'],
-                pattern['day_of_week'],
-                pattern.get('brightness', 50)
-            ]
-            features.append(feature)
-            
-            # Power labels: 1 for ON, 0 for OFF
-            power_label = 1 if pattern['action'] in ['TURN_ON', 'COLOR_CHANGE'] else 0
-            power_labels.append(power_label)
-            
-            # Color labels: encode RGB as single value
-            if pattern['color']:
-                r, g, b = pattern['color']
-                # Simple color encoding: dominant color
-                if r > g and r > b:
-                    color_class = 0  # Red dominant
-                elif g > r and g > b:
-                    color_class = 1  # Green dominant
-                elif b > r and b > g:
-                    color_class = 2  # Blue dominant
-                else:
-                    color_class = 3  # Mixed/White
-            else:
-                color_class = 3  # Default
-            
-            color_labels.append(color_class)
+        # Color labels: dominant channel, 3 for mixed/white or no color (stored as -1)
+        r, g, b = patterns['r'], patterns['g'], patterns['b']
+        color_labels = np.select(
+            [(r > g) & (r > b), (g > r) & (g > b), (b > r) & (b > g)],
+            [0, 1, 2],
+            default=3
+        )
         
-        return np.array(features), np.array(power_labels), np.array(color_labels)
+        return features, power_labels, color_labels
     
     def has_enough_data(self) -> bool:
         """Check if we have enough data for training"""
-        patterns = self.db.get_user_patterns(settings.ML_LEARNING_PERIOD_DAYS)
-        return len(patterns) >= 20  # Minimum 20 interactions
+        data_points = self.db.count_user_interactions(settings.ML_LEARNING_PERIOD_DAYS)
+        return data_points >= 20  # Minimum 20 interactions
     
     def can_start_prediction(self) -> bool:
         """Check if 1 week learning period is complete"""
@@ -117,14 +95,14 @@ class MLManager:
             self.logger.info("Starting ML model training...")
             
             # Get training data
-            patterns = self.db.get_user_patterns(settings.ML_LEARNING_PERIOD_DAYS)
+            patterns = self.db.get_user_pattern_array(settings.ML_LEARNING_PERIOD_DAYS)
             
             if len(patterns) < 10:
                 self.logger.warning("Not enough data for training")
                 return False
             
             # Prepare features
-            features, power_labels, color_labels = self._prepare_features(patterns)
+            features, power_labels, color_labels = self._prepare_feature_arrays(patterns)
             
             if len(features) == 0:
                 self.logger.warning("No valid features found")
@@ -303,14 +281,15 @@ class MLManager:
     
     def get_status(self) -> Dict:
         """Get ML manager status"""
+        data_points = self.db.count_user_interactions(settings.ML_LEARNING_PERIOD_DAYS)
         return {
             'learning_period_days': settings.ML_LEARNING_PERIOD_DAYS,
             'learning_start_date': self.learning_start_date.isoformat() if self.learning_start_date else None,
             'is_trained': self.is_trained,
             'model_accuracy': self.model_accuracy,
             'can_predict': self.can_start_prediction(),
-            'has_enough_data': self.has_enough_data(),
-            'data_points': len(self.db.get_user_patterns(settings.ML_LEARNING_PERIOD_DAYS))
+            'has_enough_data': data_points >= 20,
+            'data_points': data_points
         }
 
 # Standalone testing
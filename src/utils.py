@@ -16,6 +16,7 @@ import json
 import logging
 import time
 import colorsys
+from pathlib import Path
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Optional, Any
 import psutil
@@ -30,7 +31,8 @@ class Utils:
     def ensure_directory(self, path: str):
         """Create directory if it doesn't exist"""
         try:
-            os.makedirs(path, exist_ok=True)
+            # One mkdir call; an existing directory is not an error
+            Path(path).mkdir(parents=True, exist_ok=True)
             return True
         except Exception as e:
             self.logger.error(f"Failed to create directory {path}: {e}")
@@ -0,0 +1,180 @@
+import calendar
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from database import DatabaseManager
+
+
+V0_TIMESTAMP = '2024-01-02 03:04:05'  # CURRENT_TIMESTAMP text, UTC
+
+
+def create_v0_database(path):
+    """Create a database with the original (v0) schema and one row per table"""
+    conn = sqlite3.connect(path)
+    conn.executescript(f'''
+        CREATE TABLE user_interactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            action TEXT NOT NULL,
+            color_r INTEGER,
+            color_g INTEGER,
+            color_b INTEGER,
+            brightness INTEGER,
+            hour INTEGER,
+            day_of_week INTEGER
+        );
+        CREATE TABLE environmental_data (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            data_type TEXT NOT NULL,
+            value REAL,
+            details TEXT
+        );
+        CREATE TABLE system_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            level TEXT,
+            message TEXT
+        );
+        INSERT INTO user_interactions (timestamp, action, color_r, color_g, color_b, brightness, hour, day_of_week)
+        VALUES ('{V0_TIMESTAMP}', 'TURN_ON', 255, 0, 0, 80, 3, 1);
+        INSERT INTO environmental_data (timestamp, data_type, value, details)
+        VALUES ('{V0_TIMESTAMP}', 'temperature', 22.5, '{{"location": "room"}}');
+    ''')
+    conn.commit()
+    conn.close()
+
+
+def test_migrates_v0_database(tmp_path):
+    """Opening a v0 database converts timestamps and keeps every row"""
+    path = str(tmp_path / 'lamp.db')
+    create_v0_database(path)
+
+    db = DatabaseManager(path)
+    try:
+        conn = sqlite3.connect(db.db_path)  # the live copy, also with DATABASE_IN_MEMORY
+        expected_ts = calendar.timegm(time.strptime(V0_TIMESTAMP, '%Y-%m-%d %H:%M:%S'))
+
+        assert conn.execute(
+            'SELECT id, timestamp, action, color_r, color_g, color_b, brightness FROM user_interactions'
+        ).fetchall() == [(1, expected_ts, 'TURN_ON', 255, 0, 0, 80)]
+        assert conn.execute(
+            'SELECT id, timestamp, data_type, value FROM environmental_data'
+        ).fetchall() == [(1, expected_ts, 'temperature', 22.5)]
+
+        assert conn.execute('PRAGMA user_version').fetchone()[0] == DatabaseManager._SCHEMA_VERSION
+        assert conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2  # INCREMENTAL
+        tables = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        assert 'system_logs' not in tables
+        assert not {'user_interactions_v0', 'environmental_data_v0'} & tables
+        conn.close()
+
+        # Migrated rows are readable through the normal API
+        env = db.get_environmental_data(hours=24 * 365 * 100)
+        assert [(row['type'], row['value'], row['details']) for row in env] == [
+            ('temperature', 22.5, {'location': 'room'})]
+        assert db.get_stats()['user_interactions'] == 1
+    finally:
+        db.close()
+
+    # Reopening an already migrated database leaves it unchanged
+    db = DatabaseManager(path)
+    try:
+        assert db.get_stats()['user_interactions'] == 1
+    finally:
+        db.close()
+
+
+def test_log_read_and_cleanup(tmp_path):
+    """Logged rows read back, and get_stats follows cleanup_old_data"""
+    db = DatabaseManager(str(tmp_path / 'lamp.db'))
+    try:
+        db.log_user_action('TURN_ON', (255, 0, 0), 80)
+        db.log_user_actions([
+            ('COLOR_CHANGE', (0, 255, 0), 75),
+            ('TURN_OFF', None, None),
+        ])
+        db.log_environmental_data('temperature', 22.5, {'location': 'room'})
+        db.log_environmental_data_batch([('humidity', 40, None)])
+
+        # Rows older than the 30 day retention window
+        old_ts = int(time.time()) - 40 * 24 * 3600
+        conn = sqlite3.connect(db.db_path)
+        conn.executemany('INSERT INTO user_interactions (timestamp, action) VALUES (?, ?)',
+                         [(old_ts, 'TURN_ON'), (old_ts, 'TURN_OFF')])
+        conn.execute("INSERT INTO environmental_data (timestamp, data_type, value) VALUES (?, 'humidity', 50)",
+                     (old_ts,))
+        conn.commit()
+
+        # details is stored as plain JSON text, readable by any SQLite version
+        assert conn.execute(
+            "SELECT typeof(details), details FROM environmental_data WHERE data_type = 'temperature'"
+        ).fetchall() == [('text', '{"location":"room"}')]
+        conn.close()
+
+        patterns = db.get_user_patterns(days=1)
+        assert sorted((p['action'], p['color'], p['brightness']) for p in patterns) == [
+            ('COLOR_CHANGE', (0, 255, 0), 75),
+            ('TURN_OFF', None, None),
+            ('TURN_ON', (255, 0, 0), 80),
+        ]
+        assert len(db.get_user_pattern_array(days=1)) == 3
+        assert db.count_user_interactions(days=1) == 3
+        assert db.count_user_interactions(days=60) == 5
+
+        env = db.get_environmental_data(hours=1)
+        assert sorted((row['type'], row['value'], row['details']) for row in env) == [
+            ('humidity', 40, {}),
+            ('temperature', 22.5, {'location': 'room'}),
+        ]
+
+        stats = db.get_stats()
+        assert (stats['user_interactions'], stats['environmental_data']) == (5, 3)
+
+        db.cleanup_old_data(days=30)
+
+        stats = db.get_stats()
+        assert (stats['user_interactions'], stats['environmental_data']) == (3, 2)
+        assert len(db.get_user_patterns(days=60)) == 3
+
+        # Counts keep tracking writes made after cleanup
+        db.log_user_action('TURN_ON', (0, 0, 255), 50)
+        db.flush()
+        assert db.get_stats()['user_interactions'] == 4
+    finally:
+        db.close()
+
+
+def test_close_while_other_threads_flush(tmp_path):
+    """close() racing flush() and log_* calls neither hangs nor drops rows"""
+    path = str(tmp_path / 'lamp.db')
+    db = DatabaseManager(path)
+    stop = threading.Event()
+    logged = []
+
+    def worker():
+        while not stop.is_set():
+            db.log_user_action('TURN_ON')
+            logged.append(1)
+            db.flush()
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+
+    db.close()
+    time.sleep(0.05)  # workers keep logging and flushing after close()
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=5)
+        assert not thread.is_alive()
+
+    conn = sqlite3.connect(path)
+    assert conn.execute('SELECT COUNT(*) FROM user_interactions').fetchone()[0] == len(logged)
+    conn.close()